@@ -1,84 +1,276 @@
 import time
 import requests
+from requests.adapters import HTTPAdapter
+from requests.utils import DEFAULT_ACCEPT_ENCODING
+from urllib3.util.retry import Retry
 import logging
+from logging.handlers import QueueHandler, QueueListener
 import json
 import os
 import sys
+import functools
+import threading
+import queue
+import orjson
+from watchdog.observers import Observer
+from watchdog.events import FileSystemEventHandler
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 
-# 配置日志
-logging.basicConfig(level=logging.INFO,
-                   format='%(asctime)s - %(message)s',
-                   datefmt='%Y-%m-%d %H:%M:%S')
+# 配置日志：记录经队列交给后台线程输出，避免终端/容器日志写入阻塞监控流程
+_log_handler = logging.StreamHandler()
+_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S'))
+_log_queue = queue.Queue()
+logging.getLogger().addHandler(QueueHandler(_log_queue))
+logging.getLogger().setLevel(logging.INFO)
+log_listener = QueueListener(_log_queue, _log_handler)
+log = logging.getLogger(__name__)
+
+# 请求超时（连接, 读取），单位秒
+REQUEST_TIMEOUT = (5, 30)
+
+def create_session(pool_maxsize=4, retry_prefixes=()):
+    """
+    创建复用连接池的HTTP会话
+    
+    所有请求都只重试连接错误；retry_prefixes 中的地址前缀（只读、可重复提交的 POST 接口）
+    在返回 429/502/503/504 时也会重试
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=1, pool_maxsize=pool_maxsize,
+        max_retries=Retry(total=3, backoff_factor=0.5)
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    
+    if retry_prefixes:
+        # urllib3 默认不按状态码重试 POST，需显式允许
+        retry = Retry(
+            total=3, backoff_factor=0.5, status_forcelist=[429, 502, 503, 504],
+            allowed_methods=['POST'], raise_on_status=False
+        )
+        idempotent_adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize, max_retries=retry)
+        for prefix in retry_prefixes:
+            session.mount(prefix, idempotent_adapter)
+    return session
+
+# 监控相关配置，启动时及配置文件变化时从配置字典构建一次
+MonitorCfg = namedtuple(
+    'MonitorCfg',
+    'source dest interval delete_source refresh_every notify_copy notify_delete notify_error'
+)
+
+def build_monitor_cfg(config):
+    """从配置字典构建 MonitorCfg"""
+    monitor_config = config['monitor']
+    notification_config = config.get('notification', {})
+    return MonitorCfg(
+        source=monitor_config['source_path'],
+        dest=monitor_config['dest_path'],
+        interval=monitor_config['check_interval'],
+        delete_source=monitor_config.get('delete_source', True),
+        refresh_every=max(1, monitor_config.get('refresh_every', 5)),
+        notify_copy=notification_config.get('notify_on_copy', True),
+        notify_delete=notification_config.get('notify_on_delete', True),
+        notify_error=notification_config.get('notify_on_error', True)
+    )
 
 def load_config(config_path):
-    """加载配置文件"""
+    """加载配置文件，失败时退出程序"""
     try:
-        with open(config_path, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            
-        # 验证必要的配置项
-        required_fields = {
-            'alist': ['url'],
-            'monitor': ['source_path', 'dest_path', 'check_interval']
-        }
-        
-        for section, fields in required_fields.items():
-            if section not in config:
-                raise ValueError(f"配置文件缺少 {section} 部分")
-            for field in fields:
-                if field not in config[section]:
-                    raise ValueError(f"配置文件缺少 {section}.{field} 配置项")
-        
-        return config
+        return read_config(config_path)
     except json.JSONDecodeError as e:
-        logging.error(f"配置文件格式错误: {str(e)}")
+        log.error("配置文件格式错误: %s", e)
         sys.exit(1)
     except Exception as e:
-        logging.error(f"加载配置文件失败: {str(e)}")
+        log.error("加载配置文件失败: %s", e)
         sys.exit(1)
 
+def read_config(config_path):
+    """读取配置文件，文件未修改时直接返回已解析的配置"""
+    return _parse_config(config_path, os.stat(config_path).st_mtime)
+
+@functools.lru_cache(maxsize=1)
+def _parse_config(config_path, mtime):
+    """解析并验证配置文件，按 (路径, 修改时间) 缓存"""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+        
+    # 验证必要的配置项
+    required_fields = {
+        'alist': ['url'],
+        'monitor': ['source_path', 'dest_path', 'check_interval']
+    }
+    
+    for section, fields in required_fields.items():
+        if section not in config:
+            raise ValueError(f"配置文件缺少 {section} 部分")
+        for field in fields:
+            if field not in config[section]:
+                raise ValueError(f"配置文件缺少 {section}.{field} 配置项")
+    
+    return config
+
+# Alist 任务状态：成功，以及已取消/失败等不会再变化的失败状态
+TASK_SUCCEEDED = 2
+TASK_FAILED_STATES = (4, 7)
+# wait_task 超时时任务仍未结束
+TASK_RUNNING = 'running'
+# 每轮等待复制任务的最长时间（秒），仍未结束的任务在下一轮继续等待，不阻塞监控循环
+TASK_WAIT = 50
+
+# Discord 单条消息的最大长度
+DISCORD_MAX_LENGTH = 2000
+
+# 通知后台线程的停止标记
+_STOP = object()
+
 class DiscordNotifier:
-    def __init__(self, webhook_url, notify_config):
+    def __init__(self, webhook_url, notify_config, flush_interval=2.0):
         self.webhook_url = webhook_url
+        # 调用方应先检查 enabled，避免为不会发送的消息格式化字符串
+        self.enabled = bool(webhook_url)
         self.notify_config = notify_config
+        self.notify_on_error = notify_config.get('notify_on_error', True)
+        self.flush_interval = flush_interval
+        self.session = create_session()
+        # 令牌桶限速：Discord webhook 限制约为 5 次/秒，留出余量
+        self._min_interval = 1.0 / 4.5
+        self._next_allowed = 0.0
+        # 待合并发送的消息
+        self._queue = []
+        self._queue_lock = threading.Lock()
+        # 后台发送线程，webhook 请求不阻塞监控流程
+        self._q = queue.Queue()
+        self._next_flush = time.monotonic() + flush_interval
+        self._worker_thread = threading.Thread(target=self._worker, daemon=True)
+        self._worker_thread.start()
         
-    def send_message(self, content, is_error=False):
-        """发送消息到Discord"""
-        if not self.webhook_url:
+    def _worker(self):
+        """后台线程：依次发送消息，并定时合并发送排队的通知"""
+        while True:
+            try:
+                content = self._q.get(timeout=max(0, self._next_flush - time.monotonic()))
+            except queue.Empty:
+                content = None
+            if content is _STOP:
+                break
+            if content is not None:
+                self._post(content)
+            if time.monotonic() >= self._next_flush:
+                self.flush()
+                self._next_flush = time.monotonic() + self.flush_interval
+                
+    def close(self):
+        """发送剩余消息并停止后台线程"""
+        self.flush()
+        self._q.put(_STOP)
+        self._worker_thread.join()
+        
+    def _update_rate_limit(self, headers):
+        """根据 X-RateLimit-* 响应头调整下一次允许发送的时间"""
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_after = headers.get('X-RateLimit-Reset-After')
+        if remaining is None or reset_after is None:
             return
-            
-        # 根据配置决定是否发送通知
-        if is_error and not self.notify_config.get('notify_on_error', True):
+        try:
+            # 将剩余额度平均分配到重置窗口内，额度耗尽时等待到窗口重置
+            wait = float(reset_after) / (int(remaining) + 1)
+        except ValueError:
             return
-            
+        self._next_allowed = max(self._next_allowed, time.monotonic() + wait)
+        
+    def _should_send(self, is_error):
+        """根据配置决定是否发送通知"""
+        if not self.enabled:
+            return False
+        if is_error and not self.notify_on_error:
+            return False
+        return True
+        
+    def _post(self, content):
+        """发送一条webhook消息，处理限速和429重试（仅在后台线程中调用）"""
         try:
             data = {
                 "content": content,
                 "username": "Alist File Monitor"
             }
             
-            response = requests.post(self.webhook_url, json=data)
+            for attempt in range(4):  # 首次发送 + 最多3次429重试
+                time.sleep(max(0, self._next_allowed - time.monotonic()))
+                response = self.session.post(self.webhook_url, json=data, timeout=REQUEST_TIMEOUT)
+                self._next_allowed = time.monotonic() + self._min_interval
+                self._update_rate_limit(response.headers)
+                if response.status_code != 429 or attempt == 3:
+                    break
+                
+                try:
+                    retry_after = float(orjson.loads(response.content).get('retry_after', 1))
+                except (orjson.JSONDecodeError, AttributeError, TypeError, ValueError):
+                    retry_after = float(response.headers.get('Retry-After', 1))
+                delay = max(retry_after, 0.5 * 2 ** attempt)
+                log.warning("Discord通知被限流，%.2f秒后重试", delay)
+                time.sleep(delay)
+            
             if response.status_code != 204:
-                logging.error(f"发送Discord通知失败: {response.text}")
+                log.error("发送Discord通知失败: %s", response.text)
         except Exception as e:
-            logging.error(f"发送Discord通知时发生错误: {str(e)}")
+            log.error("发送Discord通知时发生错误: %s", e)
+        
+    def send_message(self, content, is_error=False):
+        """将消息交给后台线程发送到Discord，立即返回"""
+        if self._should_send(is_error):
+            self._q.put(content[:DISCORD_MAX_LENGTH])
+            
+    def queue(self, content, is_error=False):
+        """将消息加入队列，由 flush() 合并后发送"""
+        if self._should_send(is_error):
+            with self._queue_lock:
+                self._queue.append(content[:DISCORD_MAX_LENGTH])
+                
+    def flush(self):
+        """将队列中的消息合并为尽量少的webhook请求发送"""
+        with self._queue_lock:
+            pending, self._queue = self._queue, []
+        
+        batch = ""
+        for content in pending:
+            if batch and len(batch) + 2 + len(content) > DISCORD_MAX_LENGTH:
+                self._q.put(batch)
+                batch = ""
+            batch = f"{batch}\n\n{content}" if batch else content
+        if batch:
+            self._q.put(batch)
 
 class AlistFileManager:
-    def __init__(self, base_url, token=None, username=None, password=None, notifier=None):
+    def __init__(self, base_url, token=None, username=None, password=None, notifier=None, pool_maxsize=4):
         self.base_url = base_url.rstrip('/')
         self.username = username
         self.password = password
         self.token = token
         self.notifier = notifier
-        self.headers = {
-            'Content-Type': 'application/json'
-        }
+        # 等待超时但仍在进行的复制任务：(源目录, 目标目录, 文件名) -> 任务ID
+        self._running_copies = {}
+        # 停止监控时唤醒线程池中正在等待的检查和轮询，使其尽快返回
+        self._stop = threading.Event()
+        # 公共请求头只在会话上设置一次：保持连接复用，并允许服务端压缩目录列表等响应
+        self.session = create_session(pool_maxsize, retry_prefixes=(
+            f"{self.base_url}/api/fs/list",
+            f"{self.base_url}/api/fs/get",
+            f"{self.base_url}/api/admin/task/"
+        ))
+        self.session.headers.update({
+            'Content-Type': 'application/json',
+            'Accept-Encoding': DEFAULT_ACCEPT_ENCODING,
+            'Connection': 'keep-alive'
+        })
         
         # 如果提供了token，直接使用
         if self.token:
-            self.headers['Authorization'] = self.token
-            logging.info("使用配置文件中的token")
-            if self.notifier:
+            self.session.headers['Authorization'] = self.token
+            log.info("使用配置文件中的token")
+            if self.notifier and self.notifier.enabled:
                 self.notifier.send_message("🔑 使用配置文件中的token连接到Alist")
         else:
             # 否则尝试使用用户名和密码登录
@@ -86,6 +278,10 @@ class AlistFileManager:
                 raise ValueError("未提供token，且用户名或密码为空")
             self.login()
 
+    def stop(self):
+        """停止正在进行的文件检查、任务等待和目录轮询"""
+        self._stop.set()
+
     def login(self):
         """登录获取管理员token"""
         try:
@@ -94,36 +290,45 @@ class AlistFileManager:
                 "username": self.username,
                 "password": self.password
             }
-            response = requests.post(url, json=data)
+            response = self.session.post(url, data=orjson.dumps(data), timeout=REQUEST_TIMEOUT)
             if response.status_code == 200:
-                token = response.json().get('data', {}).get('token')
+                token = orjson.loads(response.content).get('data', {}).get('token')
                 if token:
-                    self.headers['Authorization'] = token
-                    logging.info("管理员登录成功")
-                    if self.notifier:
+                    self.session.headers['Authorization'] = token
+                    log.info("管理员登录成功")
+                    if self.notifier and self.notifier.enabled:
                         self.notifier.send_message("✅ 管理员登录成功")
                     return True
                 else:
                     error_msg = "登录成功但未获取到token"
-                    logging.error(error_msg)
-                    if self.notifier:
+                    log.error(error_msg)
+                    if self.notifier and self.notifier.enabled:
                         self.notifier.send_message(f"❌ {error_msg}", is_error=True)
                     return False
             else:
                 error_msg = f"登录失败: {response.text}"
-                logging.error(error_msg)
-                if self.notifier:
+                log.error(error_msg)
+                if self.notifier and self.notifier.enabled:
                     self.notifier.send_message(f"❌ {error_msg}", is_error=True)
                 return False
         except Exception as e:
             error_msg = f"登录时发生错误: {str(e)}"
-            logging.error(error_msg)
-            if self.notifier:
+            log.error(error_msg)
+            if self.notifier and self.notifier.enabled:
                 self.notifier.send_message(f"❌ {error_msg}", is_error=True)
             return False
 
-    def list_files(self, path):
-        """列出指定路径下的所有文件"""
+    def list_files(self, path, skip=None, refresh=True):
+        """
+        列出指定路径下的所有文件
+        
+        file_key 在 skip 中的文件（如已处理的文件）不会出现在结果中；
+        refresh 为 False 时使用 Alist 服务端的目录缓存，不强制重新读取存储
+        
+        返回:
+            dict | None: 文件名 -> 文件信息，请求失败时为 None（与空目录区分）
+        """
+        skip = skip or ()
         try:
             url = f"{self.base_url}/api/fs/list"
             data = {
@@ -131,222 +336,611 @@ class AlistFileManager:
                 "password": "",
                 "page": 1,
                 "per_page": 0,
-                "refresh": True
+                "refresh": refresh
             }
-            response = requests.post(url, headers=self.headers, json=data)
+            response = self.session.post(url, data=orjson.dumps(data), timeout=REQUEST_TIMEOUT)
             if response.status_code == 200:
-                content = response.json().get('data', {}).get('content', [])
-                return {item['name']: item for item in content if not item.get('is_dir', False)}
+                # 空目录时 content 为 null
+                content = (orjson.loads(response.content).get('data') or {}).get('content') or []
+                files = {
+                    item['name']: item for item in content
+                    if not item.get('is_dir', False) and file_key(item) not in skip
+                }
+                return files
             else:
-                logging.error(f"列出文件失败: {response.text}")
-                return {}
+                log.error("列出文件失败: %s", response.text)
+                return None
         except Exception as e:
-            logging.error(f"列出文件时发生错误: {str(e)}")
-            return {}
+            log.error("列出文件时发生错误: %s", e)
+            return None
 
-    def is_file_ready(self, path, filename, wait_time=60, check_interval=5):
+    def stat_file(self, path):
+        """
+        获取单个文件的信息，文件不存在时返回 None
+        
+        请求失败（网络错误或非 200 响应）时抛出 requests.RequestException，由调用方决定是否重试
+        """
+        url = f"{self.base_url}/api/fs/get"
+        data = {
+            "path": path,
+            "password": ""
+        }
+        response = self.session.post(url, data=orjson.dumps(data), timeout=REQUEST_TIMEOUT)
+        response.raise_for_status()
+        
+        response_json = orjson.loads(response.content)
+        if response_json.get('code') != 200:
+            return None
+        
+        item = response_json.get('data') or {}
+        return {
+            'size': item.get('size', 0),
+            'modified': item.get('modified')
+        }
+
+    def is_file_ready(self, path, filename, wait_time=60, max_interval=8.0):
         """
         检查文件是否已经下载完成并且可以安全复制
         
+        检查间隔从1秒开始按指数退避增长，文件大小变化时重置为1秒；
+        文件大小稳定后再用强制刷新的目录列表做最终确认；请求失败时继续检查，不当作文件不存在
+        
         参数:
             path: 文件所在目录
             filename: 文件名
             wait_time: 最长等待时间（秒）
-            check_interval: 检查间隔（秒）
+            max_interval: 最大检查间隔（秒）
             
         返回:
-            (bool, str): (是否准备好, 原因消息)
+            (dict | None, str): (确认文件稳定的目录列表中的文件信息，未准备好时为 None, 原因消息)
         """
-        max_attempts = wait_time // check_interval
         last_size = None
         unchanged_count = 0
         required_unchanged = 3  # 文件大小需要连续3次保持不变
+        delay = 1.0
+        start = time.monotonic()
         
-        for attempt in range(max_attempts):
+        while time.monotonic() - start < wait_time:
             try:
                 # 获取当前文件信息
-                files = self.list_files(path)
-                if filename not in files:
-                    return False, "文件不存在"
-                
-                current_file = files[filename]
-                current_size = current_file.get('size', 0)
-                current_modified = current_file.get('modified', 0)
-                
-                # 如果是第一次检查
-                if last_size is None:
-                    last_size = current_size
+                try:
+                    current_file = self.stat_file(f"{path}/{filename}")
+                except requests.exceptions.RequestException as e:
+                    log.warning("获取文件信息失败，稍后重试: %s: %s", filename, e)
+                    if self._stop.wait(delay):
+                        break
                     continue
+                if current_file is None:
+                    return None, "文件不存在"
+                
+                current_size = current_file['size']
                 
                 # 检查文件大小是否变化
-                if current_size == last_size:
+                if last_size is None:
+                    pass
+                elif current_size == last_size:
                     unchanged_count += 1
                     if unchanged_count >= required_unchanged:
-                        # 文件大小已经连续多次保持不变
-                        file_size_mb = current_size / (1024 * 1024)
-                        return True, f"文件大小 {file_size_mb:.2f}MB 已稳定"
+                        # fs/get 对部分存储返回的是 Alist 缓存的父目录信息，
+                        # 最后用强制刷新的目录列表确认一次文件大小
+                        files = self.list_files(path, refresh=True)
+                        if files is None:
+                            # 请求失败，下一次检查时再确认
+                            if self._stop.wait(delay):
+                                break
+                            continue
+                        refreshed = files.get(filename)
+                        if refreshed is None:
+                            return None, "文件不存在"
+                        current_size = refreshed.get('size', 0)
+                        if current_size == last_size:
+                            # 文件大小已经连续多次保持不变
+                            file_size_mb = current_size / (1024 * 1024)
+                            return refreshed, f"文件大小 {file_size_mb:.2f}MB 已稳定"
+                        unchanged_count = 0
+                        delay = 1.0
+                    else:
+                        delay = min(delay * 1.6, max_interval)
                 else:
-                    # 文件大小发生变化，重置计数
+                    # 文件大小发生变化，重置计数和检查间隔
                     unchanged_count = 0
-                    if self.notifier:
-                        self.notifier.send_message(
+                    delay = 1.0
+                    if self.notifier and self.notifier.enabled:
+                        self.notifier.queue(
                             f"⏳ 文件 {filename} 仍在下载中...\n"
                             f"当前大小: {current_size / (1024 * 1024):.2f}MB\n"
                             f"等待文件下载完成..."
                         )
                 
                 last_size = current_size
-                time.sleep(check_interval)
+                if self._stop.wait(delay):
+                    break
                 
             except Exception as e:
-                return False, f"检查文件状态时发生错误: {str(e)}"
+                return None, f"检查文件状态时发生错误: {str(e)}"
         
-        return False, f"等待超时（{wait_time}秒），文件可能仍在下载中"
+        if self._stop.is_set():
+            return None, "监控已停止"
+        return None, f"等待超时（{wait_time}秒），文件可能仍在下载中"
 
-    def copy_file(self, src_path, dst_path):
-        """复制文件"""
-        try:
-            # 1. 确保源文件存在
-            src_dir = '/'.join(src_path.split('/')[:-1])
-            filename = src_path.split('/')[-1]
-            dst_dir = '/'.join(dst_path.split('/')[:-1])
-            
-            files = self.list_files(src_dir)
-            if filename not in files:
-                error_msg = f"源文件不存在: {src_path}"
-                logging.error(error_msg)
-                if self.notifier:
-                    self.notifier.send_message(f"❌ {error_msg}", is_error=True)
-                return False
-            
-            # 检查文件是否已经下载完成
-            is_ready, message = self.is_file_ready(src_dir, filename)
-            if not is_ready:
-                error_msg = f"无法复制文件 {filename}: {message}"
-                logging.error(error_msg)
-                if self.notifier:
-                    self.notifier.send_message(f"⚠️ {error_msg}", is_error=True)
-                return False
-            
-            file_size = files[filename].get('size', 0)
-            file_size_mb = file_size / (1024 * 1024)
+    def wait_task(self, task_type, tid, timeout=TASK_WAIT):
+        """
+        等待 Alist 后台任务结束，检查间隔从0.5秒开始按指数退避增长；至少查询一次任务状态
+        
+        返回:
+            (bool | None | str, str): (任务是否成功, 原因消息)，无法查询任务状态时为 None，
+            超时后任务仍未结束时为 TASK_RUNNING
+        """
+        url = f"{self.base_url}/api/admin/task/{task_type}/info"
+        delay = 0.5
+        start = time.monotonic()
+        
+        while True:
+            try:
+                response = self.session.post(url, params={'tid': tid}, timeout=REQUEST_TIMEOUT)
+                if response.status_code != 200:
+                    return None, f"查询任务状态失败: {response.text}"
+                
+                response_json = orjson.loads(response.content)
+                if response_json.get('code') != 200:
+                    return None, f"查询任务状态失败: {response_json.get('message')}"
+                
+                task = response_json.get('data') or {}
+                state = task.get('state')
+                if state == TASK_SUCCEEDED:
+                    return True, "任务完成"
+                if state in TASK_FAILED_STATES:
+                    return False, task.get('error') or "任务失败"
+            except Exception as e:
+                return None, f"查询任务状态时发生错误: {str(e)}"
             
-            # 2. 发送复制请求
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0 or self._stop.wait(min(delay, remaining)):
+                break
+            delay = min(delay * 2, 4.0)
+        
+        return TASK_RUNNING, f"等待任务超时（{timeout}秒），任务仍在进行"
+
+    def check_file_ready(self, path, filename):
+        """确认文件已下载完成，返回确认时的文件信息；未完成时记录并通知原因，返回 None"""
+        file_info, message = self.is_file_ready(path, filename)
+        if file_info is None and not self._stop.is_set():
+            error_msg = f"无法复制文件 {filename}: {message}"
+            log.error(error_msg)
+            if self.notifier and self.notifier.enabled:
+                self.notifier.queue(f"⚠️ {error_msg}", is_error=True)
+        return file_info
+
+    def _submit_copy(self, src_dir, dst_dir, names, cfg, source_files):
+        """
+        发送 /api/fs/copy 请求
+        
+        返回:
+            list | None: 服务端返回的复制任务列表，服务端返回失败时为 None；
+            请求没有得到响应时（服务端可能已接受）返回空列表，由调用方轮询目标目录确认
+        """
+        try:
             url = f"{self.base_url}/api/fs/copy"
             data = {
                 "src_dir": src_dir,
                 "dst_dir": dst_dir,
-                "names": [filename]
+                "names": names
             }
             
-            logging.info(f"复制文件 {filename}")
-            logging.info(f"从: {src_dir}")
-            logging.info(f"到: {dst_dir}")
+            log.info("复制文件 %s", ', '.join(names))
+            log.info("从: %s", src_dir)
+            log.info("到: %s", dst_dir)
             
-            if self.notifier and self.notifier.notify_config.get('notify_on_copy', True):
-                self.notifier.send_message(
+            if self.notifier and self.notifier.enabled and cfg.notify_copy:
+                total_size_mb = sum(source_files[name].get('size', 0) for name in names) / (1024 * 1024)
+                self.notifier.queue(
                     f"📋 开始复制文件\n"
-                    f"文件名: {filename}\n"
-                    f"大小: {file_size_mb:.2f}MB\n"
+                    f"文件名: {', '.join(names)}\n"
+                    f"大小: {total_size_mb:.2f}MB\n"
                     f"从: {src_dir}\n"
                     f"到: {dst_dir}"
                 )
             
-            response = requests.post(url, headers=self.headers, json=data)
+            response = self.session.post(url, data=orjson.dumps(data), timeout=REQUEST_TIMEOUT)
             if response.status_code != 200:
                 error_msg = f"复制请求失败: {response.text}"
-                logging.error(error_msg)
-                if self.notifier:
-                    self.notifier.send_message(f"❌ {error_msg}", is_error=True)
-                return False
+                log.error(error_msg)
+                if self.notifier and self.notifier.enabled:
+                    self.notifier.queue(f"❌ {error_msg}", is_error=True)
+                return None
             
-            response_json = response.json()
+            response_json = orjson.loads(response.content)
             if response_json.get('code') != 200:
                 error_msg = f"复制失败: {response_json.get('message')}"
-                logging.error(error_msg)
-                if self.notifier:
-                    self.notifier.send_message(f"❌ {error_msg}", is_error=True)
-                return False
-            
-            # 3. 等待文件出现在目标目录
-            for attempt in range(10):  # 最多等待50秒
-                time.sleep(5)
-                dst_files = self.list_files(dst_dir)
-                if filename in dst_files:
-                    success_msg = f"文件复制成功: {filename}"
-                    logging.info(success_msg)
-                    if self.notifier and self.notifier.notify_config.get('notify_on_copy', True):
-                        self.notifier.send_message(f"✅ {success_msg}")
-                    return True
+                log.error(error_msg)
+                if self.notifier and self.notifier.enabled:
+                    self.notifier.queue(f"❌ {error_msg}", is_error=True)
+                return None
             
-            error_msg = f"复制超时，文件未出现在目标目录: {filename}"
-            logging.error(error_msg)
-            if self.notifier:
-                self.notifier.send_message(f"❌ {error_msg}", is_error=True)
-            return False
+            return (response_json.get('data') or {}).get('tasks') or []
             
         except Exception as e:
             error_msg = f"复制文件时发生错误: {str(e)}"
-            logging.error(error_msg)
-            if self.notifier:
-                self.notifier.send_message(f"❌ {error_msg}", is_error=True)
-            return False
+            log.error(error_msg)
+            if self.notifier and self.notifier.enabled:
+                self.notifier.queue(f"❌ {error_msg}", is_error=True)
+            return []
 
-    def delete_file(self, file_path):
-        """删除文件"""
+    def copy_files(self, src_dir, dst_dir, names, cfg, source_files):
+        """
+        通过一次 /api/fs/copy 请求复制同一目录下的多个文件
+        
+        每轮最多等待复制任务 TASK_WAIT 秒；上一轮等待超时但仍在进行的文件不会重新提交，而是继续等待原任务
+        
+        参数:
+            src_dir: 源目录
+            dst_dir: 目标目录
+            names: 要复制的文件名列表（应已确认下载完成）
+            cfg: 监控配置
+            source_files: 源目录文件列表，用于获取文件大小
+            
+        返回:
+            set: 复制成功的文件名
+        """
+        copied = set()
+        pending = []  # 需要轮询目标目录确认的文件
+        task_ids = {}
+        for name in names:
+            tid = self._running_copies.pop((src_dir, dst_dir, name), None)
+            if tid:
+                task_ids[name] = tid
+        
+        # 1. 发送复制请求；服务端返回批量复制失败时（服务端在第一个失败的文件处中止）逐个重试，
+        # 避免一个无法复制的文件拖住同批的其他文件。请求没有得到响应时不重试，避免重复创建复制任务
+        to_copy = [name for name in names if name not in task_ids]
+        if to_copy:
+            submissions = [(to_copy, self._submit_copy(src_dir, dst_dir, to_copy, cfg, source_files))]
+            if submissions[0][1] is None and len(to_copy) > 1:
+                log.warning("批量复制失败，逐个重试: %s", ', '.join(to_copy))
+                submissions = [
+                    ([name], self._submit_copy(src_dir, dst_dir, [name], cfg, source_files))
+                    for name in to_copy
+                ]
+            for batch, tasks in submissions:
+                if tasks is None:
+                    continue
+                # 服务端按 names 的顺序创建任务，数量不一致（如同一存储内直接复制）时无法对应
+                if len(tasks) == len(batch):
+                    for name, task in zip(batch, tasks):
+                        if task.get('id'):
+                            task_ids[name] = task['id']
+                        else:
+                            pending.append(name)
+                else:
+                    pending.extend(batch)
+        
+        # 2. 等待复制完成：优先查询每个文件的复制任务状态，无法查询时轮询目标目录；
+        # 本批所有任务共用 TASK_WAIT 秒的等待时间，仍在进行的任务交给下一轮
+        deadline = time.monotonic() + TASK_WAIT
+        for name, tid in task_ids.items():
+            done, message = self.wait_task('copy', tid, timeout=max(0, deadline - time.monotonic()))
+            if done == TASK_RUNNING:
+                # 不重新提交，下一轮继续等待同一个任务，避免重复复制
+                self._running_copies[(src_dir, dst_dir, name)] = tid
+                log.warning("复制任务仍在进行，下一轮继续等待: %s", name)
+            elif done is None:
+                pending.append(name)
+            elif done:
+                copied.add(name)
+            else:
+                error_msg = f"复制任务失败: {name}: {message}"
+                log.error(error_msg)
+                if self.notifier and self.notifier.enabled:
+                    self.notifier.queue(f"❌ {error_msg}", is_error=True)
+        
+        if pending:
+            for attempt in range(10):  # 最多等待50秒
+                if self._stop.wait(5):
+                    break
+                dst_files = self.list_files(dst_dir)
+                if dst_files is None:
+                    continue
+                copied.update(name for name in pending if name in dst_files)
+                pending = [name for name in pending if name not in dst_files]
+                if not pending:
+                    break
+            
+            for name in pending:
+                error_msg = f"复制超时，文件未出现在目标目录: {name}"
+                log.error(error_msg)
+                if self.notifier and self.notifier.enabled:
+                    self.notifier.queue(f"❌ {error_msg}", is_error=True)
+        
+        for name in names:
+            if name in copied:
+                success_msg = f"文件复制成功: {name}"
+                log.info(success_msg)
+                if self.notifier and self.notifier.enabled and cfg.notify_copy:
+                    self.notifier.queue(f"✅ {success_msg}")
+        return copied
+
+    def copy_running(self, src_dir, dst_dir, name):
+        """文件的复制任务是否仍在进行（将在下一轮继续等待）"""
+        return (src_dir, dst_dir, name) in self._running_copies
+
+    def _submit_remove(self, dir_path, names, cfg):
+        """
+        发送 /api/fs/remove 请求
+        
+        返回:
+            bool | None: True 表示已删除；False 表示需要轮询确认（服务端返回后台任务，
+            或请求没有得到响应、服务端可能已执行删除）；服务端返回失败时为 None
+        """
         try:
             url = f"{self.base_url}/api/fs/remove"
             data = {
-                "dir": '/'.join(file_path.split('/')[:-1]),  # 获取目录路径
-                "names": [file_path.split('/')[-1]]  # 获取文件名
+                "dir": dir_path,
+                "names": names
             }
             
-            filename = file_path.split('/')[-1]
-            logging.info(f"删除文件: {file_path}")
+            log.info("删除文件: %s", ', '.join(f'{dir_path}/{name}' for name in names))
             
-            if self.notifier and self.notifier.notify_config.get('notify_on_delete', True):
-                self.notifier.send_message(f"🗑️ 开始删除文件: {filename}")
+            if self.notifier and self.notifier.enabled and cfg.notify_delete:
+                self.notifier.queue(f"🗑️ 开始删除文件: {', '.join(names)}")
             
-            response = requests.post(url, headers=self.headers, json=data)
+            response = self.session.post(url, data=orjson.dumps(data), timeout=REQUEST_TIMEOUT)
             if response.status_code != 200:
                 error_msg = f"删除请求失败: {response.text}"
-                logging.error(error_msg)
-                if self.notifier:
-                    self.notifier.send_message(f"❌ {error_msg}", is_error=True)
-                return False
+                log.error(error_msg)
+                if self.notifier and self.notifier.enabled:
+                    self.notifier.queue(f"❌ {error_msg}", is_error=True)
+                return None
             
-            response_json = response.json()
+            response_json = orjson.loads(response.content)
             if response_json.get('code') != 200:
                 error_msg = f"删除失败: {response_json.get('message')}"
-                logging.error(error_msg)
-                if self.notifier:
-                    self.notifier.send_message(f"❌ {error_msg}", is_error=True)
-                return False
+                log.error(error_msg)
+                if self.notifier and self.notifier.enabled:
+                    self.notifier.queue(f"❌ {error_msg}", is_error=True)
+                return None
             
-            # 验证文件是否已被删除
-            for _ in range(3):  # 最多等待15秒
-                time.sleep(5)
-                files = self.list_files('/'.join(file_path.split('/')[:-1]))
-                if file_path.split('/')[-1] not in files:
-                    success_msg = f"文件删除成功: {filename}"
-                    logging.info(success_msg)
-                    if self.notifier and self.notifier.notify_config.get('notify_on_delete', True):
-                        self.notifier.send_message(f"✅ {success_msg}")
-                    return True
-            
-            error_msg = f"删除超时，文件仍然存在: {filename}"
-            logging.error(error_msg)
-            if self.notifier:
-                self.notifier.send_message(f"❌ {error_msg}", is_error=True)
-            return False
+            # Alist 同步删除文件，返回 code 200 即已删除；仅在返回后台任务时轮询确认
+            return not (response_json.get('data') or {}).get('tasks')
             
         except Exception as e:
             error_msg = f"删除文件时发生错误: {str(e)}"
-            logging.error(error_msg)
-            if self.notifier:
-                self.notifier.send_message(f"❌ {error_msg}", is_error=True)
+            log.error(error_msg)
+            if self.notifier and self.notifier.enabled:
+                self.notifier.queue(f"❌ {error_msg}", is_error=True)
             return False
 
+    def delete_files(self, dir_path, names, cfg):
+        """
+        通过一次 /api/fs/remove 请求删除同一目录下的多个文件，服务端返回批量删除失败时逐个重试
+        
+        返回:
+            set: 已删除的文件名
+        """
+        removed = set()
+        confirm = []  # 需要轮询确认的文件
+        
+        submissions = [(names, self._submit_remove(dir_path, names, cfg))]
+        if submissions[0][1] is None and len(names) > 1:
+            log.warning("批量删除失败，逐个重试: %s", ', '.join(names))
+            submissions = [([name], self._submit_remove(dir_path, [name], cfg)) for name in names]
+        
+        for batch, deleted in submissions:
+            if deleted is None:
+                continue
+            if deleted:
+                removed.update(batch)
+            else:
+                confirm.extend(batch)
+        
+        if confirm:
+            for _ in range(3):  # 最多等待15秒
+                if self._stop.wait(5):
+                    break
+                files = self.list_files(dir_path)
+                if files is None:
+                    continue
+                removed.update(name for name in confirm if name not in files)
+                confirm = [name for name in confirm if name in files]
+                if not confirm:
+                    break
+        
+        for name in names:
+            if name in removed:
+                success_msg = f"文件删除成功: {name}"
+                log.info(success_msg)
+                if self.notifier and self.notifier.enabled and cfg.notify_delete:
+                    self.notifier.queue(f"✅ {success_msg}")
+            elif name in confirm:
+                error_msg = f"删除超时，文件仍然存在: {name}"
+                log.error(error_msg)
+                if self.notifier and self.notifier.enabled:
+                    self.notifier.queue(f"❌ {error_msg}", is_error=True)
+        return removed
+
+def file_key(item):
+    """用文件名、大小和修改时间标识一个文件，同名的新文件不会被当作已处理"""
+    return (item['name'], item.get('size', 0), item.get('modified'))
+
+class ProcessedStore:
+    """已处理文件记录（以 file_key 标识），追加写入日志文件，重启后不会重复处理"""
+    def __init__(self, log_path):
+        self.log_path = log_path
+        self.session_files = []  # 本次运行中处理的文件名
+        self._keys = set()
+        
+        log_dir = os.path.dirname(log_path)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        if os.path.exists(log_path):
+            with open(log_path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        self._keys.add(tuple(orjson.loads(line)))
+                    except (orjson.JSONDecodeError, TypeError):
+                        continue  # 跳过格式不正确的行
+        self._file = open(log_path, 'a', encoding='utf-8')
+        
+    def __contains__(self, key):
+        return key in self._keys
+        
+    def __len__(self):
+        return len(self._keys)
+        
+    def add(self, file_info):
+        """记录文件为已处理，并立即写入日志文件"""
+        key = file_key(file_info)
+        if key in self._keys:
+            return
+        self._keys.add(key)
+        self.session_files.append(key[0])
+        self._file.write(orjson.dumps(list(key)).decode('utf-8') + "\n")
+        self._file.flush()
+        
+    def close(self):
+        self._file.close()
+
+class LocalMirrorHandler(FileSystemEventHandler):
+    """源目录的本地挂载中出现新文件时唤醒监控循环"""
+    def __init__(self, events):
+        self.events = events
+        
+    def on_created(self, event):
+        if not event.is_directory:
+            self.events.put(os.path.basename(event.src_path))
+            
+    def on_moved(self, event):
+        # 下载工具通常先写临时文件，完成后再重命名
+        if not event.is_directory:
+            self.events.put(os.path.basename(event.dest_path))
+
+def wait_for_new_files(events, timeout):
+    """等待本地目录事件，最多等待 timeout 秒，返回期间出现的文件名"""
+    try:
+        names = [events.get(timeout=timeout)]
+    except queue.Empty:
+        return []
+    while True:
+        try:
+            names.append(events.get_nowait())
+        except queue.Empty:
+            return names
+
+def transfer_files(alist, notifier, cfg, ready_files):
+    """
+    复制一批已下载完成的文件，并按配置删除源文件
+    
+    参数:
+        ready_files: 文件名 -> 确认文件稳定时的文件信息
+        
+    返回:
+        list: 处理完成的文件信息
+    """
+    names = list(ready_files)
+    copied = alist.copy_files(cfg.source, cfg.dest, names, cfg, ready_files)
+    copied_files = [filename for filename in names if filename in copied]
+    
+    for filename in names:
+        if filename not in copied and not alist.copy_running(cfg.source, cfg.dest, filename):
+            error_msg = f"文件 {filename} 处理失败"
+            log.error(error_msg)
+            if notifier and notifier.enabled:
+                notifier.queue(f"❌ {error_msg}", is_error=True)
+    
+    if not cfg.delete_source:
+        for filename in copied_files:
+            log.info("文件 %s 已成功处理", filename)
+        return [ready_files[filename] for filename in copied_files]
+    
+    # 复制成功后一次请求删除这一批的源文件
+    deleted = alist.delete_files(cfg.source, copied_files, cfg) if copied_files else set()
+    processed = []
+    for filename in copied_files:
+        if filename in deleted:
+            log.info("文件 %s 已成功处理并删除源文件", filename)
+            processed.append(ready_files[filename])
+        else:
+            error_msg = f"文件 {filename} 复制成功但删除源文件失败"
+            log.error(error_msg)
+            if notifier and notifier.enabled:
+                notifier.queue(f"⚠️ {error_msg}", is_error=True)
+    return processed
+
+# 首个文件就绪后最多再等待其他文件的时间（秒），让同一轮的文件合并为一次复制/删除请求
+BATCH_WAIT = 15
+
+def process_files(alist, notifier, cfg, source_files, executor):
+    """
+    处理本轮发现的新文件：并发确认文件已下载完成，将就绪的文件合并为一批复制并按配置删除源文件
+    
+    首个文件就绪后最多再等待 BATCH_WAIT 秒收集其他就绪的文件，通常一轮只发送一次复制和删除请求；
+    仍在下载的文件不会拖住整批，会在之后的批次中复制。同一时间只进行一批复制，
+    复制期间就绪的文件合并到下一批。复制及等待复制任务都在线程池中进行
+    
+    已处理记录使用确认文件稳定时的文件信息，而不是本轮开始时（文件可能仍在下载）的目录列表
+    
+    返回:
+        list: 处理完成的文件信息
+    """
+    for filename, file_info in source_files.items():
+        log.info("发现新文件: %s", filename)
+        log.info("文件大小: %.2fMB", file_info.get('size', 0) / (1024 * 1024))
+    
+    checks = {
+        executor.submit(alist.check_file_ready, cfg.source, filename): filename
+        for filename in source_files
+    }
+    transfer = None
+    ready = {}
+    deadline = None  # 当前批次最晚提交时间
+    processed = []
+    while checks or transfer or ready:
+        # 批次已就绪且没有正在进行的复制时提交：所有检查都已结束，或已等待 BATCH_WAIT 秒
+        if ready and transfer is None and (not checks or time.monotonic() >= deadline):
+            # 保持源目录中的顺序
+            batch = {filename: ready[filename] for filename in source_files if filename in ready}
+            transfer = executor.submit(transfer_files, alist, notifier, cfg, batch)
+            ready = {}
+            deadline = None
+        
+        waiting = set(checks)
+        if transfer:
+            waiting.add(transfer)
+        timeout = None
+        if ready and transfer is None:
+            timeout = max(0, deadline - time.monotonic())
+        done, _ = wait(waiting, timeout=timeout, return_when=FIRST_COMPLETED)
+        
+        for future in done:
+            if future is transfer:
+                transfer = None
+                try:
+                    processed.extend(future.result())
+                except Exception as e:
+                    error_msg = f"复制文件时发生错误: {str(e)}"
+                    log.error(error_msg)
+                    if notifier and notifier.enabled:
+                        notifier.queue(f"❌ {error_msg}", is_error=True)
+                continue
+            
+            filename = checks.pop(future)
+            try:
+                file_info = future.result()
+                if file_info:
+                    if not ready:
+                        deadline = time.monotonic() + BATCH_WAIT
+                    ready[filename] = file_info
+                    continue
+            except Exception as e:
+                error_msg = f"检查文件 {filename} 时发生错误: {str(e)}"
+                log.error(error_msg)
+                if notifier and notifier.enabled:
+                    notifier.queue(f"❌ {error_msg}", is_error=True)
+            error_msg = f"文件 {filename} 处理失败"
+            log.error(error_msg)
+            if notifier and notifier.enabled:
+                notifier.queue(f"❌ {error_msg}", is_error=True)
+    return processed
+
 def main():
     # 获取配置文件路径
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -357,6 +951,8 @@ def main():
     alist_config = config['alist']
     monitor_config = config['monitor']
     notification_config = config.get('notification', {})
+    cfg = build_monitor_cfg(config)
+    max_workers = monitor_config.get('max_workers', 4)
     
     # 创建Discord通知器
     notifier = None
@@ -373,7 +969,8 @@ def main():
             alist = AlistFileManager(
                 alist_config['url'],
                 token=alist_config['token'],
-                notifier=notifier
+                notifier=notifier,
+                pool_maxsize=max_workers
             )
         # 如果没有token，使用用户名和密码
         else:
@@ -381,80 +978,120 @@ def main():
                 alist_config['url'],
                 username=alist_config.get('username'),
                 password=alist_config.get('password'),
-                notifier=notifier
+                notifier=notifier,
+                pool_maxsize=max_workers
             )
     except Exception as e:
         error_msg = f"创建Alist管理器失败: {str(e)}"
-        logging.error(error_msg)
+        log.error(error_msg)
         if notifier:
             notifier.send_message(f"❌ {error_msg}", is_error=True)
+            notifier.close()
         sys.exit(1)
     
-    processed_files = set()
+    processed_log = os.path.join(script_dir, monitor_config.get('processed_log', 'logs/processed.log'))
+    try:
+        processed_files = ProcessedStore(processed_log)
+    except OSError as e:
+        error_msg = f"打开已处理文件记录失败: {str(e)}"
+        log.error(error_msg)
+        if notifier:
+            notifier.send_message(f"❌ {error_msg}", is_error=True)
+            notifier.close()
+        sys.exit(1)
+    if len(processed_files):
+        log.info("已加载 %d 条已处理文件记录: %s", len(processed_files), processed_log)
     
     startup_msg = (
         "🚀 开始监控Alist\n"
-        f"源路径: {monitor_config['source_path']}\n"
-        f"目标路径: {monitor_config['dest_path']}\n"
-        f"检查间隔: {monitor_config['check_interval']}秒"
+        f"源路径: {cfg.source}\n"
+        f"目标路径: {cfg.dest}\n"
+        f"检查间隔: {cfg.interval}秒\n"
+        f"并发数: {max_workers}"
     )
-    logging.info(startup_msg.replace('\n', ' '))
+    log.info(startup_msg.replace('\n', ' '))
     if notifier:
         notifier.send_message(startup_msg)
     
-    if monitor_config.get('delete_source', True):
-        logging.info("复制后将删除源文件")
-    logging.info("按Ctrl+C停止监控...")
+    if cfg.delete_source:
+        log.info("复制后将删除源文件")
+    log.info("按Ctrl+C停止监控...")
     
+    tick = 0
+    last_signature = None
+    
+    # 源目录有本地挂载时监听文件事件，新文件出现后立即检查，无需等待下一个检查间隔
+    events = queue.Queue()
+    woken = False
+    observer = None
+    local_mirror_path = monitor_config.get('local_mirror_path')
+    if local_mirror_path:
+        try:
+            observer = Observer()
+            observer.schedule(LocalMirrorHandler(events), local_mirror_path, recursive=False)
+            observer.start()
+            log.info("监听本地目录: %s", local_mirror_path)
+        except Exception as e:
+            log.error("监听本地目录失败，仅按检查间隔轮询: %s", e)
+            observer = None
+    
+    executor = ThreadPoolExecutor(max_workers=max_workers)
     try:
         while True:
             try:
-                # 获取源目录中的文件
-                source_files = alist.list_files(monitor_config['source_path'])
-                current_time = time.strftime("%Y-%m-%d %H:%M:%S")
-                logging.info(f"[{current_time}] 检查新文件...")
+                # 配置文件修改后重新加载监控配置（未修改时直接使用缓存的解析结果）
+                try:
+                    new_cfg = build_monitor_cfg(read_config(config_path))
+                except Exception as e:
+                    log.error("重新加载配置文件失败，继续使用当前配置: %s", e)
+                else:
+                    if new_cfg != cfg:
+                        cfg = new_cfg
+                        if notifier:
+                            notifier.notify_on_error = cfg.notify_error
+                        log.info("配置文件已更新: %s", cfg)
+                
+                # 每 refresh_every 轮刷新一次 Alist 目录缓存，并完整处理一次未处理的文件；
+                # 被本地目录事件唤醒时 Alist 的缓存中还没有新文件，同样需要刷新
+                full_check = woken or tick % cfg.refresh_every == 0
+                tick += 1
+                
+                # 获取源目录中尚未处理的文件
+                source_files = alist.list_files(
+                    cfg.source, skip=processed_files, refresh=full_check
+                )
+                if source_files is None:
+                    # 列出源目录失败，本轮不处理，下一轮重新检查
+                    source_files = {}
+                log.info("[%s] 检查新文件...", time.strftime("%Y-%m-%d %H:%M:%S"))
+                
+                # 未处理文件的数量和最新修改时间都与上一轮相同时，说明这些文件上一轮已尝试过
+                signature = (
+                    len(source_files),
+                    max((info.get('modified') or '' for info in source_files.values()), default='')
+                )
+                changed = full_check or signature != last_signature
+                last_signature = signature
+                if source_files and not changed:
+                    log.info("源目录无变化，跳过本轮处理")
                 
                 # 处理新文件
-                for filename, file_info in source_files.items():
-                    if filename not in processed_files:
-                        src_file_path = f"{monitor_config['source_path']}/{filename}"
-                        dst_file_path = f"{monitor_config['dest_path']}/{filename}"
-                        
-                        file_size = file_info.get('size', 0)
-                        file_size_mb = file_size / (1024 * 1024)
-                        
-                        logging.info(f"发现新文件: {filename}")
-                        logging.info(f"文件大小: {file_size_mb:.2f}MB")
-                        
-                        # 复制文件到目标目录
-                        if alist.copy_file(src_file_path, dst_file_path):
-                            # 复制成功后删除源文件（如果配置为True）
-                            if monitor_config.get('delete_source', True):
-                                if alist.delete_file(src_file_path):
-                                    processed_files.add(filename)
-                                    success_msg = f"文件 {filename} 已成功处理并删除源文件"
-                                    logging.info(success_msg)
-                                else:
-                                    error_msg = f"文件 {filename} 复制成功但删除源文件失败"
-                                    logging.error(error_msg)
-                                    if notifier:
-                                        notifier.send_message(f"⚠️ {error_msg}", is_error=True)
-                            else:
-                                processed_files.add(filename)
-                                success_msg = f"文件 {filename} 已成功处理"
-                                logging.info(success_msg)
-                        else:
-                            error_msg = f"文件 {filename} 处理失败"
-                            logging.error(error_msg)
-                            if notifier:
-                                notifier.send_message(f"❌ {error_msg}", is_error=True)
+                if source_files and changed:
+                    for file_info in process_files(alist, notifier, cfg, source_files, executor):
+                        processed_files.add(file_info)
+                
+                if notifier:
+                    notifier.flush()
                 
-                # 按配置的间隔时间检查
-                time.sleep(monitor_config['check_interval'])
+                # 按配置的间隔时间检查，本地目录出现新文件时提前检查
+                new_names = wait_for_new_files(events, cfg.interval)
+                woken = bool(new_names)
+                if woken:
+                    log.info("本地目录出现新文件: %s", ', '.join(new_names))
                 
             except requests.exceptions.RequestException as e:
                 error_msg = f"网络请求失败: {str(e)}"
-                logging.error(error_msg)
+                log.error(error_msg)
                 if notifier:
                     notifier.send_message(f"⚠️ {error_msg}\n等待30秒后重试...", is_error=True)
                 time.sleep(30)
@@ -462,15 +1099,17 @@ def main():
                 
     except KeyboardInterrupt:
         print("\n")  # 为了美观，在新行显示停止消息
+        if notifier:
+            notifier.flush()
         stop_msg = (
             "🛑 停止监控\n"
-            f"已处理的文件数量: {len(processed_files)}"
+            f"已处理的文件数量: {len(processed_files.session_files)}"
         )
-        logging.info(stop_msg.replace('\n', ' '))
+        log.info(stop_msg.replace('\n', ' '))
         
-        if processed_files:
-            files_msg = "已处理的文件列表:\n" + "\n".join(f"  - {filename}" for filename in sorted(processed_files))
-            logging.info(files_msg)
+        if processed_files.session_files:
+            files_msg = "已处理的文件列表:\n" + "\n".join(f"  - {filename}" for filename in sorted(processed_files.session_files))
+            log.info(files_msg)
             if notifier:
                 notifier.send_message(f"{stop_msg}\n{files_msg}")
         elif notifier:
@@ -479,15 +1118,28 @@ def main():
         sys.exit(0)
     except Exception as e:
         error_msg = f"发生错误: {str(e)}"
-        logging.error(error_msg)
+        log.error(error_msg)
         if notifier:
             notifier.send_message(f"❌ {error_msg}", is_error=True)
         raise
+    finally:
+        if observer:
+            observer.stop()
+            observer.join()
+        # shutdown 不会中断正在运行的任务，先让它们停止等待，避免退出时被阻塞
+        alist.stop()
+        executor.shutdown(wait=False, cancel_futures=True)
+        processed_files.close()
+        if notifier:
+            notifier.close()
 
 if __name__ == "__main__":
+    log_listener.start()
     try:
         main()
     except Exception as e:
         error_msg = f"程序异常退出: {str(e)}"
-        logging.error(error_msg)
+        log.error(error_msg)
         sys.exit(1)
+    finally:
+        log_listener.stop()